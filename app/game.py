@@ -10,10 +10,13 @@ from sqlalchemy.orm import Session
 
 from app.config import settings
 from app.models import Connection, User
+from app.recommend import mark_connected
 from app.redis_client import get_redis
 
 CONNECT_RE = re.compile(r"^CONNECT_(?P<user_id>[A-Za-z0-9_-]{4,32})$", re.IGNORECASE)
 
+REGISTER_FIRST_MESSAGE = "Please register first: send 'join' and complete your profile."
+
 
 def normalize_whatsapp_number(value: str | None) -> str:
     # Twilio provides numbers like: whatsapp:+551199999999
@@ -32,6 +35,10 @@ class ConnectionResult:
     message_to_connectee: str | None
 
 
+def is_registered(user: User) -> bool:
+    return bool(user.name and user.email and user.linkedin_url and user.raw_profile_text)
+
+
 def ensure_user(db: Session, phone: str) -> User:
     user = db.get(User, phone)
     if user:
@@ -71,10 +78,10 @@ def connect_users(db: Session, *, connector_phone: str, connectee_user_id: str)
         return ConnectionResult(ok=False, message_to_connector="Missing WhatsApp sender.", message_to_connectee=None)
 
     connector = ensure_user(db, connector_phone)
-    if not (connector.name and connector.email and connector.linkedin_url and connector.raw_profile_text):
+    if not is_registered(connector):
         return ConnectionResult(
             ok=False,
-            message_to_connector="Please register first: send 'join' and complete your profile.",
+            message_to_connector=REGISTER_FIRST_MESSAGE,
             message_to_connectee=None,
         )
     connectee = db.query(User).filter(User.user_id == connectee_user_id).one_or_none()
@@ -100,6 +107,7 @@ def connect_users(db: Session, *, connector_phone: str, connectee_user_id: str)
             message_to_connectee=None,
         )
 
+    mark_connected(connector.phone_number, connectee.phone_number)
     award_points(db, phone=connector.phone_number, delta=settings.connect_points)
     award_points(db, phone=connectee.phone_number, delta=settings.connect_points)
 
@@ -4,19 +4,27 @@ import logging
 
 from fastapi import Depends, FastAPI, Header, HTTPException, Request, Response
 from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
+from redis.exceptions import RedisError
 from sqlalchemy.orm import Session
-from twilio.twiml.messaging_response import MessagingResponse
 
 from app.config import settings
-from app.db import engine, get_db_session
-from app.game import CONNECT_RE, connect_users, ensure_user, normalize_whatsapp_number
+from app.db import SessionLocal, engine, get_db_session
+from app.game import (
+    CONNECT_RE,
+    REGISTER_FIRST_MESSAGE,
+    connect_users,
+    ensure_user,
+    is_registered,
+    normalize_whatsapp_number,
+)
 from app.models import Base, User
 from app.onboarding import start as start_onboarding
 from app.onboarding import handle_message
 from app.hf_client import categorize_profile_text
 from app.qr import generate_wa_qr_jpg, generate_wa_qr_png
+from app.recommend import next_message, rebuild_index, reindex, touch
 from app.redis_client import get_redis
-from app.twilio_utils import send_whatsapp_message, validate_twilio_signature
+from app.twilio_utils import send_whatsapp_message, twiml_message, twiml_reply, validate_twilio_signature
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("innovation_hunt")
@@ -25,6 +33,10 @@ app = FastAPI(title="Innovation Hunt")
 app.add_middleware(ProxyHeadersMiddleware, trusted_hosts="*")
 
 
+def _twiml(*messages: str) -> Response:
+    return Response(content=twiml_reply(*messages), media_type="application/xml")
+
+
 def _public_url_for(request: Request, path: str) -> str:
     """Build a public URL that Twilio can fetch (prefers forwarded headers).
 
@@ -45,6 +57,11 @@ def _public_url_for(request: Request, path: str) -> str:
 @app.on_event("startup")
 def _startup() -> None:
     Base.metadata.create_all(bind=engine)
+    try:
+        with SessionLocal() as db:
+            rebuild_index(db)
+    except RedisError as e:
+        logger.warning("Recommendation index backfill skipped: %s", e)
 
 
 @app.get("/health")
@@ -88,44 +105,49 @@ async def whatsapp_webhook(
     db: Session = Depends(get_db_session),
     x_twilio_signature: str | None = Header(default=None),
 ):
-    # Twilio sends application/x-www-form-urlencoded
-    form = dict(await request.form())
+    # Twilio sends application/x-www-form-urlencoded; anything else (e.g. multipart
+    # with file parts) is rejected so the parsed form holds only str values.
+    content_type = request.headers.get("content-type", "")
+    if not content_type.lower().startswith("application/x-www-form-urlencoded"):
+        raise HTTPException(status_code=415, detail="Expected application/x-www-form-urlencoded")
+    form = await request.form()
     from_number = normalize_whatsapp_number(form.get("From"))
     body = (form.get("Body") or "").strip()
 
     # Validate signature (optional)
-    absolute_url = str(request.url)
-    if not validate_twilio_signature(url=absolute_url, form={k: str(v) for k, v in form.items()}, signature=x_twilio_signature):
+    if not validate_twilio_signature(url=str(request.url), form=form, signature=x_twilio_signature):
         raise HTTPException(status_code=403, detail="Invalid Twilio signature")
 
-    ensure_user(db, from_number)
-
-    twiml = MessagingResponse()
+    sender = ensure_user(db, from_number)
+    touch(sender.phone_number, sender.category)
 
     # 1) CONNECT flow
     m = CONNECT_RE.match(body)
     if m:
         result = connect_users(db, connector_phone=from_number, connectee_user_id=m.group("user_id").upper())
-        twiml.message(result.message_to_connector)
         if result.ok and result.message_to_connectee:
             # Proactive message to connectee (best-effort; requires Twilio creds)
             connectee = db.query(User).filter(User.user_id == m.group("user_id").upper()).one_or_none()
             if connectee:
                 send_whatsapp_message(to=connectee.phone_number, body=result.message_to_connectee)
-        return Response(content=str(twiml), media_type="application/xml")
+        return _twiml(twiml_message(result.message_to_connector))
+
+    # 2) "Who to meet next" suggestions
+    if body.lower() == settings.next_keyword.lower():
+        if is_registered(sender):
+            return _twiml(twiml_message(next_message(db, sender)))
+        return _twiml(twiml_message(REGISTER_FIRST_MESSAGE))
 
-    # 2) Join/onboarding trigger
+    # 3) Join/onboarding trigger
     if body.lower().startswith(settings.join_keyword.lower()):
         reply = start_onboarding(db, phone=from_number)
-        twiml.message(reply)
-        return Response(content=str(twiml), media_type="application/xml")
+        return _twiml(twiml_message(reply))
 
-    # 3) If user is mid-onboarding, capture fields
+    # 4) If user is mid-onboarding, capture fields
     reply, about_ready = handle_message(db, phone=from_number, text=body)
 
     if not about_ready:
-        twiml.message(reply)
-        return Response(content=str(twiml), media_type="application/xml")
+        return _twiml(twiml_message(reply))
 
     # About step completed: categorize + send QR as a single media message.
     user = db.get(User, from_number)
@@ -137,20 +159,20 @@ async def whatsapp_webhook(
             db.add(user)
             db.commit()
             category_label = user.category or "UNKNOWN"
+            reindex(user.phone_number, user.category)
         except (ImportError, RuntimeError, OSError, ValueError) as e:
             logger.exception("Categorization failed: %s", e)
 
     if user and settings.twilio_whatsapp_from:
         qr_path = request.url_for("qr_media_jpg", user_id=user.user_id).path
         qr_url = _public_url_for(request, qr_path)
-        msg = twiml.message(
-            f"{reply}\n"
-            f"Category: {category_label}.\n"
-            f"Here is your QR code. Have others scan it to connect!"
+        return _twiml(
+            twiml_message(
+                f"{reply}\n"
+                f"Category: {category_label}.\n"
+                f"Here is your QR code. Have others scan it to connect!",
+                media_url=qr_url,
+            )
         )
-        msg.media(qr_url)
-    else:
-        twiml.message(reply)
-        twiml.message("Set TWILIO_WHATSAPP_FROM to generate your QR.")
 
-    return Response(content=str(twiml), media_type="application/xml")
+    return _twiml(twiml_message(reply), twiml_message("Set TWILIO_WHATSAPP_FROM to generate your QR."))
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import Connection, User
+from app.redis_client import get_redis
+
+CATEGORIES = ("LEAD", "TALENT", "PARTNER")
+
+# How much a meeting with each category is worth, from the sender's point of view.
+COMPLEMENTS: dict[str, dict[str, float]] = {
+    "LEAD": {"TALENT": 1.0, "PARTNER": 0.6},
+    "TALENT": {"LEAD": 1.0, "PARTNER": 0.6},
+    "PARTNER": {"LEAD": 1.0, "TALENT": 0.8},
+}
+
+# Users read per ZREVRANGE window, and how many windows to page through per
+# category before giving up on finding enough not-yet-connected people.
+CANDIDATE_PAGE = 50
+MAX_PAGES = 10
+# Hyperbolic recency decay: activity this old counts half as much.
+RECENCY_SCALE_S = 30 * 60
+# Leaderboard points at which a candidate's activity boost doubles.
+POINTS_SCALE = 100
+
+
+def _active_key(category: str) -> str:
+    return f"{settings.active_index_key}:{category}"
+
+
+def _connected_key(phone: str) -> str:
+    return f"{settings.connected_key}:{phone}"
+
+
+@dataclass(frozen=True)
+class Suggestion:
+    phone: str
+    category: str
+    score: float
+
+
+def touch(phone: str, category: str | None) -> None:
+    """Record `phone` as active now in its category index (no-op if uncategorized)."""
+    category = (category or "").upper()
+    if category in CATEGORIES:
+        get_redis().zadd(_active_key(category), {phone: time.time()})
+
+
+def reindex(phone: str, category: str | None) -> None:
+    """Move `phone` into its (new) category index; call when the category is set."""
+    category = (category or "").upper()
+    pipe = get_redis().pipeline(transaction=False)
+    for other in CATEGORIES:
+        if other != category:
+            pipe.zrem(_active_key(other), phone)
+    if category in CATEGORIES:
+        pipe.zadd(_active_key(category), {phone: time.time()})
+    pipe.execute()
+
+
+def mark_connected(a_phone: str, b_phone: str) -> None:
+    pipe = get_redis().pipeline(transaction=False)
+    pipe.sadd(_connected_key(a_phone), b_phone)
+    pipe.sadd(_connected_key(b_phone), a_phone)
+    pipe.execute()
+
+
+def forget(*phones: str) -> None:
+    """Drop `phones` from every category index (e.g. users gone from Postgres)."""
+    if not phones:
+        return
+    pipe = get_redis().pipeline(transaction=False)
+    for category in CATEGORIES:
+        pipe.zrem(_active_key(category), *phones)
+    pipe.execute()
+
+
+def rebuild_index(db: Session) -> None:
+    """Sync the Redis indexes with Postgres (run at startup).
+
+    Missing members are added and members without a matching user (or in the
+    wrong category) are removed; activity already recorded by `touch()` for
+    existing users is kept.
+    """
+    redis = get_redis()
+    categories: dict[str, str] = {}
+    created: dict[str, float] = {}
+    for phone, category, created_at in db.query(User.phone_number, User.category, User.created_at):
+        categories[phone] = (category or "").upper()
+        created[phone] = created_at.timestamp() if created_at else time.time()
+
+    pipe = redis.pipeline(transaction=False)
+    for category in CATEGORIES:
+        stale = [p for p in redis.zrange(_active_key(category), 0, -1) if categories.get(p) != category]
+        if stale:
+            pipe.zrem(_active_key(category), *stale)
+    for phone, category in categories.items():
+        if category in CATEGORIES:
+            pipe.zadd(_active_key(category), {phone: created[phone]}, nx=True)
+
+    prefix = f"{settings.connected_key}:"
+    for key in redis.scan_iter(match=f"{prefix}*"):
+        if key[len(prefix):] not in categories:
+            pipe.delete(key)
+            continue
+        stale = [p for p in redis.smembers(key) if p not in categories]
+        if stale:
+            pipe.srem(key, *stale)
+    for connector, connectee in db.query(Connection.connector_phone, Connection.connectee_phone):
+        pipe.sadd(_connected_key(connector), connectee)
+        pipe.sadd(_connected_key(connectee), connector)
+    pipe.execute()
+
+
+def suggest(phone: str, category: str | None, *, limit: int) -> list[Suggestion]:
+    """Rank recently active, not-yet-connected users from complementary categories.
+
+    Reads only Redis: the sender's connected set, then each category paged by
+    recency (one pipelined round trip per page) until it yields `limit`
+    unconnected candidates or runs out, then the candidates' leaderboard points.
+    """
+    weights = COMPLEMENTS.get((category or "").upper(), dict.fromkeys(CATEGORIES, 1.0))
+    redis = get_redis()
+
+    connected = redis.smembers(_connected_key(phone))
+
+    candidates: list[tuple[str, str, float, float]] = []
+    found = dict.fromkeys(weights, 0)
+    pending = list(weights)
+    for page in range(MAX_PAGES):
+        if not pending:
+            break
+        start = page * CANDIDATE_PAGE
+        pipe = redis.pipeline(transaction=False)
+        for other in pending:
+            pipe.zrevrange(_active_key(other), start, start + CANDIDATE_PAGE - 1, withscores=True)
+        still_pending = []
+        for other, members in zip(pending, pipe.execute()):
+            for member, last_active in members:
+                if member != phone and member not in connected:
+                    candidates.append((member, other, weights[other], last_active))
+                    found[other] += 1
+            if found[other] < limit and len(members) == CANDIDATE_PAGE:
+                still_pending.append(other)
+        pending = still_pending
+    if not candidates:
+        return []
+
+    points = redis.zmscore(settings.leaderboard_key, [c[0] for c in candidates])
+    now = time.time()
+    scored = []
+    for (member, other, weight, last_active), pts in zip(candidates, points):
+        recency = 1.0 / (1.0 + max(0.0, now - last_active) / RECENCY_SCALE_S)
+        activity = 1.0 + (pts or 0.0) / POINTS_SCALE
+        scored.append(Suggestion(phone=member, category=other, score=weight * recency * activity))
+
+    scored.sort(key=lambda s: s.score, reverse=True)
+    return scored[:limit]
+
+
+def next_message(db: Session, user: User) -> str:
+    limit = settings.next_suggestions
+    found: list[tuple[Suggestion, User]] = []
+    # Phones in the index without a Postgres row are pruned and the ranking is
+    # retried, so stale entries can't crowd out real candidates.
+    for _ in range(3):
+        suggestions = suggest(user.phone_number, user.category, limit=limit)
+        if not suggestions:
+            break
+        by_phone = {
+            u.phone_number: u
+            for u in db.query(User).filter(User.phone_number.in_([s.phone for s in suggestions]))
+        }
+        found = [(s, by_phone[s.phone]) for s in suggestions if s.phone in by_phone]
+        stale = [s.phone for s in suggestions if s.phone not in by_phone]
+        if not stale:
+            break
+        forget(*stale)
+
+    if not found:
+        return "No new people to suggest right now. Try again in a bit!"
+
+    lines = ["Who to meet next:"]
+    for i, (s, other) in enumerate(found, start=1):
+        lines.append(f"{i}. {other.name or 'Someone'} ({s.category}) - {other.linkedin_url or '(No LinkedIn yet)'}")
+    return "\n".join(lines)
@@ -1,6 +1,10 @@
 from __future__ import annotations
 
 import logging
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Any
+from xml.sax.saxutils import escape
 
 from twilio.request_validator import RequestValidator
 from twilio.rest import Client
@@ -9,8 +13,37 @@ from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Precompiled TwiML for the fixed reply shapes; same output as MessagingResponse
+# without building an element tree per request.
+_TWIML_HEAD = '<?xml version="1.0" encoding="UTF-8"?><Response>'
+_TWIML_TAIL = "</Response>"
+_TWIML_MESSAGE = "<Message>{body}</Message>"
+_TWIML_MESSAGE_MEDIA = "<Message>{body}<Media>{media}</Media></Message>"
 
-def validate_twilio_signature(*, url: str, form: dict[str, str], signature: str | None) -> bool:
+
+def twiml_message(body: str, media_url: str | None = None) -> str:
+    """A single escaped `<Message>` element, optionally with one `<Media>`."""
+    if media_url is None:
+        return _TWIML_MESSAGE.format(body=escape(body))
+    return _TWIML_MESSAGE_MEDIA.format(body=escape(body), media=escape(media_url))
+
+
+def twiml_reply(*messages: str) -> str:
+    """Full TwiML document from `twiml_message()` fragments."""
+    return _TWIML_HEAD + "".join(messages) + _TWIML_TAIL
+
+
+@lru_cache(maxsize=1)
+def _validator(auth_token: str) -> RequestValidator:
+    return RequestValidator(auth_token)
+
+
+def validate_twilio_signature(*, url: str, form: Mapping[str, Any], signature: str | None) -> bool:
+    """Check the X-Twilio-Signature header.
+
+    `form` may be a multidict (e.g. Starlette `FormData`); repeated keys are read
+    via `getlist`. Non-str values (multipart file parts) fail validation.
+    """
     if not settings.twilio_validate_signature:
         return True
     if not settings.twilio_auth_token:
@@ -18,8 +51,10 @@ def validate_twilio_signature(*, url: str, form: dict[str, str], signature: str
         return False
     if not signature:
         return False
-    validator = RequestValidator(settings.twilio_auth_token)
-    return validator.validate(url, form, signature)
+    try:
+        return _validator(settings.twilio_auth_token).validate(url, form, signature)
+    except TypeError:
+        return False
 
 
 def send_whatsapp_message(*, to: str, body: str) -> None:
@@ -0,0 +1,2 @@
+# Root conftest: lets pytest put the repo root on sys.path so `import app` works
+# however the suite is started (`pytest` or `python -m pytest`).
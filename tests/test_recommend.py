@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import fnmatch
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app import recommend
+from app.config import settings
+from app.models import Base, Connection, User
+from app.recommend import mark_connected, next_message, rebuild_index, reindex, suggest, touch
+
+
+class FakeRedis:
+    """Just the ZSET/SET commands the recommendation index uses."""
+
+    def __init__(self):
+        self.zsets: dict[str, dict[str, float]] = {}
+        self.sets: dict[str, set[str]] = {}
+
+    def pipeline(self, transaction: bool = True):
+        return FakePipeline(self)
+
+    def zadd(self, key, mapping, nx=False):
+        zset = self.zsets.setdefault(key, {})
+        added = 0
+        for member, score in mapping.items():
+            if nx and member in zset:
+                continue
+            added += member not in zset
+            zset[member] = float(score)
+        return added
+
+    def zrem(self, key, *members):
+        zset = self.zsets.get(key, {})
+        return sum(zset.pop(m, None) is not None for m in members)
+
+    def zrange(self, key, start, end):
+        return [m for m, _ in sorted(self.zsets.get(key, {}).items(), key=lambda i: i[1])][start : _stop(end)]
+
+    def zrevrange(self, key, start, end, withscores=False):
+        items = sorted(self.zsets.get(key, {}).items(), key=lambda i: i[1], reverse=True)[start : _stop(end)]
+        return items if withscores else [m for m, _ in items]
+
+    def zincrby(self, key, amount, member):
+        zset = self.zsets.setdefault(key, {})
+        zset[member] = zset.get(member, 0.0) + amount
+        return zset[member]
+
+    def zmscore(self, key, members):
+        zset = self.zsets.get(key, {})
+        return [zset.get(m) for m in members]
+
+    def sadd(self, key, *members):
+        self.sets.setdefault(key, set()).update(members)
+
+    def srem(self, key, *members):
+        self.sets.get(key, set()).difference_update(members)
+
+    def smembers(self, key):
+        return set(self.sets.get(key, set()))
+
+    def delete(self, *keys):
+        for key in keys:
+            self.zsets.pop(key, None)
+            self.sets.pop(key, None)
+
+    def scan_iter(self, match="*"):
+        return [k for k in [*self.zsets, *self.sets] if fnmatch.fnmatchcase(k, match)]
+
+
+class FakePipeline:
+    def __init__(self, redis: FakeRedis):
+        self._redis = redis
+        self._calls = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self._calls.append((getattr(self._redis, name), args, kwargs))
+
+        return queue
+
+    def execute(self):
+        calls, self._calls = self._calls, []
+        return [fn(*args, **kwargs) for fn, args, kwargs in calls]
+
+
+def _stop(end: int) -> int | None:
+    return None if end == -1 else end + 1
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(recommend, "get_redis", lambda: fake)
+    return fake
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def _active(redis: FakeRedis, category: str) -> dict[str, float]:
+    return redis.zsets.get(f"{settings.active_index_key}:{category}", {})
+
+
+def _add_user(db: Session, phone: str, category: str | None) -> User:
+    user = User(
+        phone_number=phone,
+        user_id=phone[-6:].upper(),
+        name=f"User {phone}",
+        email=f"{phone}@example.com",
+        linkedin_url=f"https://linkedin.com/in/{phone}",
+        raw_profile_text="x" * 40,
+        category=category,
+    )
+    db.add(user)
+    db.commit()
+    return user
+
+
+def test_skips_sender_and_connected(redis):
+    for phone in ("me", "a", "b"):
+        touch(phone, "TALENT")
+    touch("lead", "LEAD")
+    mark_connected("me", "a")
+
+    phones = {s.phone for s in suggest("me", "PARTNER", limit=10)}
+
+    assert phones == {"b", "lead"}
+    assert "me" in redis.smembers(f"{settings.connected_key}:a")
+
+
+def test_complementary_weights_rank_same_activity(redis):
+    now = time.time()
+    redis.zadd(f"{settings.active_index_key}:LEAD", {"lead": now})
+    redis.zadd(f"{settings.active_index_key}:PARTNER", {"partner": now})
+    redis.zadd(f"{settings.active_index_key}:TALENT", {"talent": now})
+
+    ranked = suggest("me", "TALENT", limit=10)
+
+    assert [s.phone for s in ranked] == ["lead", "partner"]
+    assert ranked[0].score > ranked[1].score
+
+
+def test_uncategorized_sender_sees_all_categories(redis):
+    for category in recommend.CATEGORIES:
+        touch(category.lower(), category)
+
+    assert {s.category for s in suggest("me", None, limit=10)} == set(recommend.CATEGORIES)
+
+
+def test_pages_past_connected_window(redis):
+    now = time.time()
+    key = f"{settings.active_index_key}:LEAD"
+    for i in range(recommend.CANDIDATE_PAGE + 2):
+        redis.zadd(key, {f"p{i}": now - i})
+    for i in range(recommend.CANDIDATE_PAGE):
+        mark_connected("me", f"p{i}")
+
+    ranked = suggest("me", "TALENT", limit=2)
+
+    assert [s.phone for s in ranked] == [f"p{recommend.CANDIDATE_PAGE}", f"p{recommend.CANDIDATE_PAGE + 1}"]
+
+
+def test_missing_points_and_points_boost(redis):
+    now = time.time()
+    redis.zadd(f"{settings.active_index_key}:LEAD", {"quiet": now, "busy": now})
+    redis.zincrby(settings.leaderboard_key, 50, "busy")
+
+    ranked = suggest("me", "TALENT", limit=10)
+
+    assert [s.phone for s in ranked] == ["busy", "quiet"]
+    assert ranked[0].score == pytest.approx(ranked[1].score * 1.5, rel=1e-3)
+
+
+def test_reindex_moves_between_categories(redis):
+    reindex("me", "TALENT")
+    reindex("me", "LEAD")
+    assert "me" in _active(redis, "LEAD")
+    assert "me" not in _active(redis, "TALENT")
+
+    reindex("me", None)
+    assert all("me" not in _active(redis, c) for c in recommend.CATEGORIES)
+
+
+def test_next_message_prunes_stale_phones(redis, db, monkeypatch):
+    monkeypatch.setattr(settings, "next_suggestions", 1)
+    me = _add_user(db, "me", "TALENT")
+    _add_user(db, "real", "LEAD")
+    touch("real", "LEAD")
+    redis.zadd(f"{settings.active_index_key}:LEAD", {"ghost": time.time() + 60})
+
+    reply = next_message(db, me)
+
+    assert reply.startswith("Who to meet next:\n1. User real (LEAD)")
+    assert "ghost" not in _active(redis, "LEAD")
+
+
+def test_next_message_only_stale_phones(redis, db):
+    me = _add_user(db, "me", "TALENT")
+    touch("ghost", "LEAD")
+
+    assert next_message(db, me).startswith("No new people to suggest")
+
+
+def test_rebuild_index_syncs_with_postgres(redis, db):
+    _add_user(db, "me", "TALENT")
+    _add_user(db, "lead", "LEAD")
+    db.add(Connection(connector_phone="me", connectee_phone="lead"))
+    db.commit()
+    touch("me", "TALENT")
+    recorded = _active(redis, "TALENT")["me"]
+    touch("ghost", "LEAD")
+    touch("lead", "PARTNER")
+    mark_connected("me", "ghost")
+
+    rebuild_index(db)
+
+    assert _active(redis, "TALENT") == {"me": recorded}
+    assert set(_active(redis, "LEAD")) == {"lead"}
+    assert "lead" not in _active(redis, "PARTNER")
+    assert redis.smembers(f"{settings.connected_key}:me") == {"lead"}
+    assert f"{settings.connected_key}:ghost" not in redis.sets
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import timeit
+
+import pytest
+from starlette.datastructures import FormData, UploadFile
+from twilio.request_validator import RequestValidator
+from twilio.twiml.messaging_response import MessagingResponse
+
+from app import twilio_utils
+from app.config import settings
+from app.twilio_utils import twiml_message, twiml_reply, validate_twilio_signature
+
+AUTH_TOKEN = "test-auth-token"
+URL = "https://example.ngrok-free.app/whatsapp"
+FORM = FormData(
+    [
+        ("SmsMessageSid", "SM0123456789abcdef0123456789abcdef"),
+        ("NumMedia", "0"),
+        ("ProfileName", "Ada"),
+        ("WaId", "5581999999999"),
+        ("Body", "CONNECT_ABCD1234"),
+        ("To", "whatsapp:+14155238886"),
+        ("From", "whatsapp:+5581999999999"),
+        ("AccountSid", "AC0123456789abcdef0123456789abcdef"),
+    ]
+)
+REPLY = "Connected with Ada! +10 points.\nTheir LinkedIn: https://linkedin.com/in/ada"
+
+
+@pytest.fixture
+def signed(monkeypatch):
+    monkeypatch.setattr(settings, "twilio_validate_signature", True)
+    monkeypatch.setattr(settings, "twilio_auth_token", AUTH_TOKEN)
+    twilio_utils._validator.cache_clear()
+    return RequestValidator(AUTH_TOKEN).compute_signature(URL, dict(FORM))
+
+
+def _legacy(*messages: str | tuple[str, str]) -> str:
+    twiml = MessagingResponse()
+    for message in messages:
+        if isinstance(message, tuple):
+            twiml.message(message[0]).media(message[1])
+        else:
+            twiml.message(message)
+    return str(twiml)
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        REPLY,
+        "Tom & Jerry <3 > all",
+        "Registered!\nCategory: TALENT.\nHere is your QR code. Have others scan it to connect!",
+        "quotes \" and ' stay as-is",
+    ],
+)
+def test_text_reply_matches_messaging_response(body):
+    assert twiml_reply(twiml_message(body)) == _legacy(body)
+
+
+def test_media_reply_matches_messaging_response():
+    media = "https://example.ngrok-free.app/media/qr/AB&CD.jpg?a=1&b=<2>"
+    assert twiml_reply(twiml_message("Here & <now>", media_url=media)) == _legacy(("Here & <now>", media))
+
+
+def test_multi_message_reply_matches_messaging_response():
+    assert twiml_reply(twiml_message("a & b"), twiml_message("c < d")) == _legacy("a & b", "c < d")
+
+
+def test_signature_accepts_form_data(signed):
+    assert validate_twilio_signature(url=URL, form=FORM, signature=signed)
+    assert not validate_twilio_signature(url=URL, form=FORM, signature="bogus")
+
+
+def test_signature_rejects_file_parts(signed):
+    form = FormData([*FORM.multi_items(), ("Upload", UploadFile(file=None, filename="x.txt"))])
+    assert not validate_twilio_signature(url=URL, form=form, signature=signed)
+
+
+def _per_call_us(fn, number: int = 2000) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+def test_template_reply_is_faster_than_messaging_response():
+    def legacy() -> str:
+        twiml = MessagingResponse()
+        twiml.message(REPLY)
+        return str(twiml)
+
+    def lean() -> str:
+        return twiml_reply(twiml_message(REPLY))
+
+    assert legacy() == lean()
+    legacy_us, lean_us = _per_call_us(legacy), _per_call_us(lean)
+    print(f"\nreply build: MessagingResponse {legacy_us:.1f}us, template {lean_us:.1f}us")
+    assert lean_us * 3 < legacy_us
+
+
+def test_cached_validator_setup_is_faster(signed):
+    # Only the per-request setup differs; the HMAC itself is identical in both
+    # paths and is left out so it doesn't swamp the comparison.
+    def legacy() -> RequestValidator:
+        form = dict(FORM)
+        _ = {k: str(v) for k, v in form.items()}
+        return RequestValidator(AUTH_TOKEN)
+
+    def lean() -> RequestValidator:
+        return twilio_utils._validator(settings.twilio_auth_token)
+
+    assert validate_twilio_signature(url=URL, form=FORM, signature=signed)
+    legacy_us, lean_us = _per_call_us(legacy), _per_call_us(lean)
+    print(f"\nvalidator setup: copy + new RequestValidator {legacy_us:.2f}us, cached {lean_us:.2f}us")
+    assert lean_us * 3 < legacy_us